@@ -1,11 +1,18 @@
 """Config parser to get the configuration for each of the packages being wrapped
 by acorn.
 """
+from os import path, stat
+from six.moves.configparser import ConfigParser
+
 packages = {}
 """dict: keys are package names, values are ConfigParser() instances with
 configuration information for each package.
 """
-from six.moves.configparser import ConfigParser
+_mtimes = {}
+"""dict: keys are package names, values are tuples of the modification times of
+the package and `acorn` config files at the time the cached parser in
+:data:`packages` was created.
+"""
 class CaseConfigParser(ConfigParser):
     """Case-sensitive configuration parser; we need to preseve the
     case-sensitive names of FQDNs in the option strings.
@@ -18,7 +25,6 @@ def config_dir(mkcustom=False):
     """
     from acorn.utility import reporoot
     from acorn.base import testmode
-    from os import path
     alternate = path.join(path.abspath(path.expanduser("~")), ".acorn")
     if testmode or (not path.isdir(alternate) and not mkcustom):
         return path.join(reporoot, "acorn", "config")
@@ -36,7 +42,6 @@ def _package_path(package):
     Args:
     package (str): name of the python package to return a path for.    
     """
-    from os import path
     confdir = config_dir()
     return path.join(confdir, "{}.cfg".format(package))
 
@@ -48,26 +53,46 @@ def _read_single(parser, filepath):
     parser (ConfigParser): parser to read the file into.
     filepath (str): full path to the config file.
     """
-    from os import path
-    global packages
-    if path.isfile(filepath):
-        parser.readfp(open(filepath))
+    parser.read(filepath)
+
+def _mtime(filepath):
+    """Returns the modification time of the specified file, or `None` if it
+    does not exist.
+
+    Args:
+    filepath (str): full path to the config file.
+    """
+    try:
+        return stat(filepath).st_mtime
+    except OSError:
+        return None
 
 def settings(package, reload_=False):
-    """Returns the config settings for the specified package.
+    """Returns the config settings for the specified package. The parsed
+    settings are cached and only re-read if `reload_` is specified or one of the
+    underlying config files has changed on disk.
 
     Args:
         package (str): name of the python package to get settings for.
+        reload_ (bool): when True, force the config files to be re-parsed.
     """
     global packages
-    if package not in packages or reload_:
-        from os import path
+    acornpath = _package_path("acorn")
+    if package != "acorn":
+        confpath = _package_path(package)
+        mtimes = (_mtime(confpath), _mtime(acornpath))
+    else:
+        confpath = None
+        mtimes = (None, _mtime(acornpath))
+
+    if (package not in packages or reload_ or
+        _mtimes.get(package) != mtimes):
         result = CaseConfigParser()
-        if package != "acorn":
-            confpath = _package_path(package)
+        if confpath is not None:
             _read_single(result, confpath)
-        _read_single(result, _package_path("acorn"))
+        _read_single(result, acornpath)
         packages[package] = result
+        _mtimes[package] = mtimes
 
     return packages[package]
 
@@ -77,7 +102,6 @@ def _descriptor_path(package):
     Args:
     package (str): name of the python package to return a path for.    
     """
-    from os import path
     return path.join(config_dir(), "{}.json".format(package))
 
 def descriptors(package):
@@ -87,7 +111,6 @@ def descriptors(package):
     Args:
         package (str): name of the python package to get settings for.
     """
-    from os import path
     dpath = _descriptor_path(package)
     if path.isfile(dpath):
         import json
@@ -1,12 +1,71 @@
 """Methods and classes for creating a JSON database from a tree of
 calls to methods with various objects passed as arguments.
 """
+import re
+import json
+import weakref
+import types as typ
+from glob import glob
+from functools import partial
+from itertools import count
+from os import path, mkdir, getcwd, chdir, remove
+try:
+    from os import replace
+except ImportError: # pragma: no cover
+    #Python 2 only has rename, which is still atomic on POSIX systems.
+    from os import rename as replace
 from uuid import uuid4
+try:
+    from time import monotonic
+except ImportError: # pragma: no cover
+    #Python 2 doesn't have a monotonic clock in the standard library.
+    from time import time as monotonic
+
+import six
+#We reference :func:`acorn.config.settings` through the module so that the
+#import stays safe while the `acorn` package is still initializing.
+import acorn.config
 from acorn import msg
+from acorn.logging.descriptors import describe
+from acorn.logging.diff import cascade, compress
+from acorn.utility import abspath
+
+_UUID_RE = re.compile(r"\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+                      r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z")
+"""re.Pattern: matches the string form of a :meth:`uuid.uuid4` value; much
+cheaper than catching the `ValueError` from the :class:`uuid.UUID` constructor
+for the (common) case where the string is not a UUID.
+"""
+
+def _dumps(obj):
+    """Serializes the specified object to UTF-8 encoded JSON bytes.
+
+    Args:
+        obj: JSON-serializable python object.
+    """
+    return json.dumps(obj).encode("utf-8")
+
+def _loads(data):
+    """Deserializes the specified UTF-8 encoded JSON bytes.
+
+    Args:
+        data (bytes): contents of a JSON file.
+    """
+    return json.loads(data.decode("utf-8"))
+
+_uuid_prefix = str(uuid4())[:24]
+"""str: random prefix shared by all the :class:`Instance` uuids generated by this
+process.
+"""
+_uuid_counter = count()
+"""itertools.count: sequence that makes each :class:`Instance` uuid unique within
+this process.
+"""
 
 oids = {}
 """dict: keys are python :meth:`id` values, values are the :class:`Instance`
-class instances from which JSON database can be constructed.
+class instances from which JSON database can be constructed. Entries are removed
+once the original object is garbage collected.
 """
 uuids = {}
 """dict: keys are the :class:`UUID` string values; values are :class:`Instance`
@@ -57,8 +116,6 @@ def list_tasks(target=None):
         dict: keys are project names; values are lists of tasks associated with the
           project.
     """
-    from os import getcwd, chdir
-    from glob import glob
     original = getcwd()
     if target is None:# pragma: no cover
         target = _dbdir()
@@ -126,6 +183,18 @@ def cleanup():
         msg.err("Project {1}.{2} save failed:\n{0}".format(tb, *fdb),
                 prefix=False)
     
+_untracked = (six.string_types + six.integer_types +
+              (float, complex, six.text_type))
+"""tuple: built-in types whose values are stored directly instead of being
+tracked by :func:`tracker`.
+"""
+_semitrack = (list, dict, set, tuple)
+"""tuple: container types that are summarized by :func:`tracker` if all their
+elements are untracked; otherwise each element is tracked separately.
+"""
+if six.PY3: # pragma: no cover
+    _semitrack = _semitrack + (range, filter, map)
+
 def tracker(obj):
     """Returns the :class:`Instance` of the specified object if it is one that
     we track by default.
@@ -137,19 +206,10 @@ def tracker(obj):
         Instance: if the object is trackable, the Instance instance of
           that object; else None.
     """
-    import types as typ
     global oids, uuids
-    import six
-    from inspect import isclass
-    untracked = (six.string_types, six.integer_types, float,
-                 complex, six.text_type)
-
-    semitrack = (list, dict, set, tuple)
-    if six.PY3: # pragma: no cover
-        semitrack = semitrack + (range, filter, map)
-        
+    untracked, semitrack = _untracked, _semitrack
     if (isinstance(obj, semitrack) and
-        all([isinstance(t, untracked) for t in obj])):
+        all(isinstance(t, untracked) for t in obj)):
         if len(obj) > 0:
             semiform = "{0} len={1:d} min={2} max={3}"
             return semiform.format(type(obj), len(obj), min(obj), max(obj))
@@ -209,15 +269,27 @@ def tracker(obj):
     else:
         return None
 
+def _forget(oid, uuid, ref):
+    """Removes the :class:`Instance` for an object that has been garbage
+    collected from :data:`oids` and :data:`uuids`, so that its python :meth:`id`
+    can be safely reused by a new object.
+
+    Args:
+        oid (int): python memory address of the collected object.
+        uuid (str): uuid of the :class:`Instance` for the collected object.
+        ref (weakref.ref): dead reference to the object.
+    """
+    if oid in oids and oids[oid].uuid == uuid:
+        del oids[oid]
+    uuids.pop(uuid, None)
+
 def _dbdir():
     """Returns the path to the directory where acorn DBs are stored.
     """
     global dbdir
-    from os import mkdir, path, getcwd, chdir
     
     if dbdir is None:
-        from acorn.config import settings
-        config = settings("acorn")
+        config = acorn.config.settings("acorn")
         if (config.has_section("database") and
             config.has_option("database", "folder")):
             dbdir = config.get("database", "folder")
@@ -227,7 +299,6 @@ def _dbdir():
 
     #It is possible to specify the database path relative to the repository
     #root. path.abspath will map it correctly if we are in the root directory.
-    from acorn.utility import abspath
     if not path.isabs(dbdir):
         #We want absolute paths to make it easier to port this to other OS.
         dbdir = abspath(dbdir)
@@ -272,7 +343,6 @@ def save_image(byteio, imgfmt):
     Returns:
         str: a uuid for the saved image that can be added to the database entry.
     """
-    from os import path, mkdir
     ptdir = "{}.{}".format(project, task)
     uuid = str(uuid4())
 
@@ -330,7 +400,17 @@ class TaskDB(object):
           dicts with attributes describing the class instance's origin.
         dbpath (str): full path to the database JSON file for this task
           database.
-        lastsave (float): timestamp since the last time the DB was saved.
+        walpath (str): full path to the append-only JSONL log of the entries and
+          uuids recorded since the database JSON file was last rewritten.
+        walgen (int): generation of the database JSON file; the log is only
+          replayed on :meth:`load` if its header has the same generation.
+        lastsave (float): value of the monotonic clock (in seconds) the last
+          time the DB was saved.
+        savefreq (int): number of minutes to wait between full rewrites of the
+          database JSON file; read once from the global settings file.
+        flush_every (int): number of entries that can be recorded before the
+          log is flushed to disk, regardless of `savefreq`.
+        pending (int): number of entries recorded since the last flush.
     """
     def __init__(self, dbdir=None):      
         self.entities = {}
@@ -338,13 +418,18 @@ class TaskDB(object):
         if dbdir is None:
             dbdir = _dbdir()
 
-        from os import path
         if project == "default" and task == "default": # pragma: no cover
             msg.warn("The project and task are using default values. "
                      "Use :meth:`acorn.set_task` to change them.")
         self.dbpath = path.join(dbdir, "{}.{}.json".format(project, task))
+        self.walpath = path.join(dbdir, "{}.{}.jsonl".format(project, task))
+        self.walgen = 0
+        self._wal = None
         
         self.lastsave = None
+        self.savefreq = TaskDB.get_option("savefreq", 2, int)
+        self.flush_every = TaskDB.get_option("flush_every", 200, int)
+        self.pending = 0
         self.load()
 
     def log_uuid(self, uuid):
@@ -357,8 +442,30 @@ class TaskDB(object):
         """
         #We only need to try and describe an object once; if it is already in
         #our database, then just move along.
-        if uuid not in self.uuids and uuid in uuids:
-            self.uuids[uuid] = uuids[uuid].describe()
+        if uuid in self.uuids:
+            return
+
+        instance = uuids.get(uuid)
+        if instance is not None:
+            self.uuids[uuid] = instance.describe()
+            self._append({"u": uuid, "d": self.uuids[uuid]})
+
+    def _append(self, line):
+        """Appends a single line to the write-ahead log so that the database
+        JSON file doesn't have to be rewritten for every entry.
+
+        Args:
+            line (dict): either `{"k": ekey, "e": entry}` for an entry or `{"u":
+              uuid, "d": description}` for a uuid.
+        """
+        if not writeable:
+            return
+
+        if self._wal is None:
+            self._wal = open(self.walpath, 'ab', 1 << 16)
+            if self._wal.tell() == 0:
+                self._wal.write(_dumps({"g": self.walgen}) + b"\n")
+        self._wal.write(_dumps(line) + b"\n")
         
     def record(self, ekey, entry, diff=False):
         """Records the specified entry to the key-value store under the specified
@@ -371,13 +478,16 @@ class TaskDB(object):
               against previous entries under the same `ekey` if their method
               (attribute "m") matches.
         """
+        #The decorators tell us which of the arguments are tracked instances,
+        #so that we don't have to scan them all for uuids. This is only needed
+        #for the bookkeeping here, so it doesn't get saved with the entry.
+        uids = entry.pop("_uuid_args", None)
         if ekey not in self.entities:
             self.entities[ekey] = []
             
         #See if we need to diff the code to compress it.
         if diff and len(self.entities[ekey]) > 0:
             #Compress the code element of the current entry that we are saving.
-            from acorn.logging.diff import cascade, compress
             sequence = [e["c"] for e in self.entities[ekey]
                         if e["m"] == entry["m"]]
             original = cascade(sequence)
@@ -386,20 +496,19 @@ class TaskDB(object):
             entry["c"] = difference
 
         self.entities[ekey].append(entry)
+        self.pending += 1
+        self._append({"k": ekey, "e": entry})
 
         #We also need to make sure we have uuids and origin information stored
         #for any uuids present in the parameter string.
-        from uuid import UUID
         uid = None
         if entry["r"] is not None:
             uid = entry["r"]
         elif isinstance(ekey, str):
             #For many methods we don't duplicate the UUID in the returns part
             #because it wastes space. In those cases, the ekey is a UUID.
-            try:
-                uid = str(UUID(ekey))
-            except ValueError: # pragma: no cover
-                pass
+            if len(ekey) == 36 and _UUID_RE.match(ekey):
+                uid = ekey
 
         if uid is not None and isinstance(uid, str):
             self.log_uuid(uid)
@@ -408,39 +517,32 @@ class TaskDB(object):
         #so we set that to None to save space.
         if entry["a"] is None:
             return
+
+        if uids is not None:
+            for uid in uids:
+                self.log_uuid(uid)
+            return
                     
         for larg in entry["a"]["_"]:
-            #We use the constructor to determine if the format of the argument
-            #is a valid UUID; if it isn't then we catch the error and keep
-            #going.
-            if not isinstance(larg, str):
-                continue
-            
-            try:
-                uid = str(UUID(larg))
-                self.log_uuid(uid)
-            except ValueError:
-                #This was obviously not a UUID, we don't need to worry about it,
-                #it has a user-readable string instead.
-                pass
+            #Most arguments are user-readable strings rather than UUIDs, so we
+            #only bother logging those that match the UUID format.
+            if (isinstance(larg, str) and len(larg) == 36 and
+                _UUID_RE.match(larg)):
+                self.log_uuid(larg)
 
         #We also need to handle the keyword arguments; these are keyed by name.
         for key, karg in entry["a"].items():
             if key == "_" or not isinstance(karg, str):
                 #Skip the positional arguments since we already handled them.
                 continue
-            try:
-                uid = str(UUID(karg))
-                self.log_uuid(uid)
-            except ValueError:
-                pass            
+            if len(karg) == 36 and _UUID_RE.match(karg):
+                self.log_uuid(karg)
 
     @staticmethod
     def get_option(option, default=None, cast=None):
         """Returns the option value for the specified acorn database option.
         """
-        from acorn.config import settings
-        config = settings("acorn")
+        config = acorn.config.settings("acorn")
         if (config.has_section("database") and
             config.has_option("database", option)):
             result = config.get("database", option)
@@ -458,60 +560,107 @@ class TaskDB(object):
         #writable. After all, the user may decide part-way through a session to
         #begin writing again, and then we would want a history up to that point
         #to be valid.
-        from os import path
         if path.isfile(self.dbpath):
-            import json
-            with open(self.dbpath) as f:
-                jdb = json.load(f)
+            with open(self.dbpath, 'rb') as f:
+                jdb = _loads(f.read())
                 self.entities = jdb["entities"]
                 self.uuids = jdb["uuids"]
+                self.walgen = jdb.get("walgen", 0)
+
+        #Replay any entries that were logged after the database JSON file was
+        #last rewritten. If the generation doesn't match, then the rewrite
+        #completed but the stale log was never removed, so we remove it now. A
+        #corrupt header (e.g., from a crash during the first flush) is treated
+        #the same way.
+        if path.isfile(self.walpath):
+            with open(self.walpath, 'rb') as f:
+                lines = f.read().splitlines()
+            try:
+                walgen = _loads(lines[0]).get("g") if len(lines) > 0 else None
+            except ValueError:
+                walgen = None
+            if walgen is None or walgen != self.walgen:
+                remove(self.walpath)
+                lines = []
+            for line in lines[1:]:
+                try:
+                    item = _loads(line)
+                except ValueError: # pragma: no cover
+                    #A partially-written final line from a crash.
+                    break
+                if "u" in item:
+                    self.uuids[item["u"]] = item["d"]
+                else:
+                    ekey = item["k"]
+                    if isinstance(ekey, list):
+                        ekey = tuple(ekey)
+                    self.entities.setdefault(ekey, []).append(item["e"])
             
     def save(self, force=False):
-        """Serializes the database file to disk.
+        """Serializes the database file to disk. Between full rewrites, the
+        entries are only appended to the log at :attr:`walpath`, which is
+        flushed every :attr:`flush_every` entries.
 
         Args:
             force (bool): when True, the elapsed time since last save is ignored
                 and the database is saved anyway (subject to global
                 :data:`writeable` setting).
         """
-        from time import time
-
         # Since the DBs can get rather large, we don't want to save them every
         # single time a method is called. Instead, we only save them at the
         # frequency specified in the global settings file.
-        from datetime import datetime
-        savefreq = TaskDB.get_option("savefreq", 2, int)
-        
         if self.lastsave is not None:
-            delta = (datetime.fromtimestamp(time()) -
-                     datetime.fromtimestamp(self.lastsave)) 
-            elapsed = int(delta.total_seconds()/60)
+            elapsed = monotonic() - self.lastsave
         else:
-            elapsed = savefreq + 1
+            elapsed = None
+
+        if elapsed is not None and elapsed <= self.savefreq*60 and not force:
+            #It isn't time to rewrite the whole database yet; just make sure the
+            #buffered log entries don't sit in memory for too long.
+            if self.pending >= self.flush_every and self._wal is not None:
+                self._wal.flush()
+                self.pending = 0
+            return
 
-        if elapsed > savefreq or force:
-            if not writeable:
-                #We still overwrite the lastsave value so that this message doesn't
-                #keep getting output for every :meth:`record` call.
-                self.lastsave = time()
-                msg.std("Skipping database write to disk by setting.", 2)
-                return
+        if not writeable:
+            #We still overwrite the lastsave value so that this message doesn't
+            #keep getting output for every :meth:`record` call.
+            self.lastsave = monotonic()
+            self.pending = 0
+            msg.std("Skipping database write to disk by setting.", 2)
+            return
 
-            import json
-            try:
-                entities, compkeys = _json_clean(self.entities)
-                jdb = {"entities": entities,
-                       "compkeys": compkeys,
-                       "uuids": self.uuids}
-                with open(self.dbpath, 'w') as f:
-                    json.dump(jdb, f)
-            except: # pragma: no cover
-                from acorn.msg import err
-                import sys
-                raise
-                err("{}: {}".format(*sys.exc_info()[0:2]))
-
-            self.lastsave = time()
+        try:
+            entities, compkeys = _json_clean(self.entities)
+            jdb = {"entities": entities,
+                   "compkeys": compkeys,
+                   "uuids": self.uuids,
+                   "walgen": self.walgen + 1}
+            #Serializing to bytes first and writing them in one go is much
+            #faster than letting json stream lots of small writes. We write
+            #to a temporary file first so that a crash part-way through
+            #doesn't clobber the existing database.
+            payload = _dumps(jdb)
+            tmppath = self.dbpath + ".tmp"
+            with open(tmppath, 'wb', 1 << 16) as f:
+                f.write(payload)
+            replace(tmppath, self.dbpath)
+
+            #Everything in the log is now in the database JSON file.
+            self.walgen += 1
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            if path.isfile(self.walpath):
+                remove(self.walpath)
+        except: # pragma: no cover
+            from acorn.msg import err
+            import sys
+            raise
+            err("{}: {}".format(*sys.exc_info()[0:2]))
+
+        self.lastsave = monotonic()
+        self.pending = 0
     
 class Instance(object):
     """Represents a class instance in the current session which can be
@@ -522,18 +671,34 @@ class Instance(object):
         pid (int): python memory address (returned by :func:`id`).
 
     Attributes:
-        uuid (str): :meth:`uuid.uuid4` for the object.
+        uuid (str): unique id for the object; formatted like a
+          :meth:`uuid.uuid4` so that it can be found in the argument lists.
         obj: original object instance that this represents.
     """
     def __init__(self, pid, obj):
         self.pid = pid
-        self.uuid = str(uuid4())
-        self.obj = obj
+        #Generating a real uuid4 for every object costs a call to os.urandom;
+        #a random per-process prefix with a counter is just as unique.
+        self.uuid = "{}{:012x}".format(_uuid_prefix, next(_uuid_counter))
+        try:
+            #We only hold a weak reference so that tracking an object doesn't
+            #keep it alive for the rest of the session.
+            self._ref = weakref.ref(obj, partial(_forget, pid, self.uuid))
+        except TypeError:
+            #Some objects (e.g., those with __slots__) can't be weakly
+            #referenced, so we have to keep them alive ourselves.
+            self._ref = lambda: obj
+
+    @property
+    def obj(self):
+        """Returns the original object instance that this represents, or `None`
+        if it has since been garbage collected.
+        """
+        return self._ref()
         
     def describe(self):
         """Returns a dictionary describing the object based on its type.
         """
-        result = {}
         #Because we created an Instance object, we already know that this object
         #is not one of the regular built-in types (except, perhaps, for list,
         #dict and set objects that can have their tracking turned on).
@@ -541,5 +706,4 @@ class Instance(object):
         #For objects that are instantiated by the user in __main__, we will
         #already have a paper trail that shows exactly how it was done; but for
         #these, we have to rely on human-specified descriptions.
-        from acorn.logging.descriptors import describe
         return describe(self.obj)
@@ -278,12 +278,13 @@ def filter_name(funcname, package, context="decorate", explicit=False):
             
     return matched
 
-def _tracker_str(item):
+def _tracker_str(item, uids=None):
     """Returns a string representation of the tracker object for the given item.
     
     Args:
         item: object to get tracker for.
-        fqdn (str): fully-qualified domain name of the object.
+        uids (list): if specified, the uuid of the tracker is appended to this
+          list when `item` is tracked as an :class:`Instance`.
     """
     instance = tracker(item)
     if instance is not None:
@@ -292,6 +293,8 @@ def _tracker_str(item):
         elif isinstance(instance, tuple):
             return instance
         else:
+            if uids is not None:
+                uids.append(instance.uuid)
             return instance.uuid
     else:
         #Must be a simple built-in type like `int` or `float`, in which case we
@@ -300,15 +303,21 @@ def _tracker_str(item):
     
 def _check_args(*argl, **argd):
     """Checks the specified argument lists for objects that are trackable.
+
+    Returns:
+        tuple: `(args, uids)`, where `args` has the tracker strings of the
+        positional (under key `_`) and keyword arguments, and `uids` is a list of
+        the uuids of any arguments that are tracked instances.
     """
     args = {"_": []}
+    uids = []
     for item in argl:
-        args["_"].append(_tracker_str(item))
+        args["_"].append(_tracker_str(item, uids))
            
     for key, item in argd.items():
-        args[key] = _tracker_str(item)
+        args[key] = _tracker_str(item, uids)
         
-    return args
+    return (args, uids)
 
 def _decorated_path(spath, ipython=True):
     """Checks whether the specified code path is from a package that has been
@@ -363,10 +372,11 @@ def _pre_create(cls, atdepth, stackdepth, *argl, **argd):
         reduced = stackdepth + 10
 
     if reduced <= stackdepth:
-        args = _check_args(*argl, **argd)
+        args, uids = _check_args(*argl, **argd)
         entry = {
             "m": "{}.__new__".format(cls.__fqdn__),
             "a": args,
+            "_uuid_args": uids,
             "s": time(),
             "r": None,
             "stack": reduced
@@ -506,7 +516,7 @@ def _pre_call(atdepth, parent, fqdn, stackdepth, *argl, **argd):
 
     bound = False
     if reduced <= stackdepth:
-        args = _check_args(*argl, **argd)
+        args, uids = _check_args(*argl, **argd)
         # At this point, we should start the entry. If the method raises an
         # exception, we should keep track of that. If this is an instance
         # method, we should get its UUID, if not, then we can just store the
@@ -542,6 +552,7 @@ def _pre_call(atdepth, parent, fqdn, stackdepth, *argl, **argd):
             entry = {
                 "m": fqdn,
                 "a": args,
+                "_uuid_args": uids,
                 "s": time(),
                 "r": None,
                 "c": code,
@@ -19,7 +19,6 @@ def describe(o):
     """
     #First, we need to determine the fqdn, so that we can lookup the format for
     #this object in the config file for the package.
-    from inspect import getmodule
     from acorn.logging.decoration import _fqdn
     fqdn = _fqdn(o, False)
     if fqdn is None:
@@ -4,11 +4,26 @@ from django.template import RequestContext
 import os
 import json
 
+from matplotlib.colors import rgb2hex as r2h
+from numpy import linspace
+try:
+    from matplotlib import colormaps
+    _CMAP = colormaps["nipy_spectral"]
+except ImportError: # pragma: no cover
+    #Older versions of matplotlib only have the function-based registry.
+    from matplotlib.cm import get_cmap
+    _CMAP = get_cmap("nipy_spectral")
+
 from acorn.config import settings
 
 acorn_settings = settings("acorn")
 db_dir = os.path.expanduser(acorn_settings.get("database","folder"))
 
+_projects_cache = {}
+"""dict: keys are tuples of (path, mtime) for the database folder; values are
+the project listings returned by :func:`_make_projcet_list` for that folder.
+"""
+
 def _get_colors(n):
     """Returns n unique and "evenly" spaced colors for the backgrounds
     of the projects.
@@ -19,14 +34,7 @@ def _get_colors(n):
     Returns:
         colors (list of str): The colors in hex form.
     """
-
-    import matplotlib.pyplot as plt
-    from matplotlib.colors import rgb2hex as r2h
-    from numpy import linspace
-
-    cols = linspace(0.05, .95, n)
-    cmap = plt.get_cmap('nipy_spectral')
-    return [r2h(cmap(i)) for i in cols]
+    return [r2h(_CMAP(i)) for i in linspace(0.05, .95, n)]
 
 def _color_variant(hex_color, brightness_offset=1):
     """Takes a color like #87c95f and produces a lighter or darker variant.
@@ -45,18 +53,11 @@ def _color_variant(hex_color, brightness_offset=1):
     """
     if len(hex_color) != 7:
         raise Exception("Passed %s into color_variant(), needs to be in #87c95f format." % hex_color)
-    rgb_hex = [hex_color[x:x+2] for x in [1, 3, 5]]
-    new_rgb_int = [int(hex_value, 16) + brightness_offset for hex_value in rgb_hex]
-    new_rgb_int = [min([255, max([0, i])]) for i in new_rgb_int] # make sure new values are between 0 and 255
-    # hex() produces "0x88", we want just "88"
-    new_color = "#"
-    for i in new_rgb_int:
-        if len(hex(i)[2:]) == 2:
-            new_color += hex(i)[2:]
-        else:
-            new_color += hex(i)[2:] + "0"
-
-    return new_color
+    rgb_int = (int(hex_color[1:3], 16), int(hex_color[3:5], 16),
+               int(hex_color[5:7], 16))
+    # make sure new values are between 0 and 255
+    new_rgb_int = [min(255, max(0, i + brightness_offset)) for i in rgb_int]
+    return "#{:02x}{:02x}{:02x}".format(*new_rgb_int)
 
 
 def _make_projcet_list(path):
@@ -71,33 +72,32 @@ def _make_projcet_list(path):
           containing a list of it's tasks.
     """
     from collections import OrderedDict
-    from matplotlib.colors import LinearSegmentedColormap
-    from matplotlib.colors import rgb2hex as r2h
-    from numpy import linspace
     
-    proj = []
-    projects = OrderedDict()
-    file_list = os.listdir(path)
-    for files in file_list:
-        if files.split(".")[0] not in proj and 'json' in files and "#" not in files and "~" not in files:
-            proj.append(files.split(".")[0])
+    # group the tasks by project in a single pass over the directory.
+    found = OrderedDict()
+    for files in os.listdir(path):
+        if not files.endswith(".json") or "#" in files or "~" in files:
+            continue
+        parts = files.split(".")
+        if len(parts) < 3:
+            continue
+        found.setdefault(parts[0], []).append(parts[1])
 
     # get the background color for each project.
-    colors = _get_colors(len(proj))
+    colors = _get_colors(len(found))
     p_c = 0
 
-    for p in proj:
+    projects = OrderedDict()
+
+    for p, temp in found.items():
         tasks = OrderedDict()
-        temp = [x.split(".")[1] for x in file_list if p in x and "#" not in x and "~" not in x]
-        cmspace = linspace(0.95, 0.25, len(temp))
-        cm = LinearSegmentedColormap.from_list("acorn.{}".format(p),
-                                               ['#ffffff', colors[p_c]],
-                                               N=max((len(temp), 25)))
-        hues = [r2h(cm(cmi)) for cmi in cmspace]
-        h_c = 0
-        for t in temp:
-            tasks[t] = [hues[h_c],p+"."+t+".json"]
-            h_c += 1
+        hex_color = colors[p_c]
+        base = (int(hex_color[1:3], 16), int(hex_color[3:5], 16),
+                int(hex_color[5:7], 16))
+        # each task gets a shade between white and the project color.
+        for t, cmi in zip(temp, linspace(0.95, 0.25, len(temp))):
+            rgb = [int(round(255 - (255 - c)*cmi)) for c in base]
+            tasks[t] = ["#{:02x}{:02x}{:02x}".format(*rgb), p+"."+t+".json"]
         tasks["hex_color"] = colors[p_c]
         projects[p] = tasks
         p_c += 1
@@ -105,41 +105,42 @@ def _make_projcet_list(path):
     return projects
         
 
-def index(request):
-    context = RequestContext(request)
-    projects = request.session.get('projects')
-    if not projects:
-        projects = _make_projcet_list(db_dir)
+def _projects_for(path):
+    """Returns the project listing for the specified folder, only rescanning
+    the folder if it has changed since the last listing was made.
+
+    Args:
+        path (str): The path to the folder containing the *.json files.
+    """
+    key = (path, os.stat(path).st_mtime)
+    if key not in _projects_cache:
+        _projects_cache.clear()
+        _projects_cache[key] = _make_projcet_list(path)
+    return _projects_cache[key]
 
-    context_dict = {'projects':projects}
-    return render_to_response("ui/index.html", context_dict, context)
+def _render(request, template):
+    """Renders the specified template with the project listing for the
+    configured database folder.
 
-def about(request):
+    Args:
+        request: The incoming http request.
+        template (str): The path to the template to render.
+    """
     context = RequestContext(request)
-    projects = request.session.get('projects')
-    if not projects:
-        projects = _make_projcet_list(db_dir)
+    context_dict = {'projects':_projects_for(db_dir)}
+    return render_to_response(template, context_dict, context)
+
+def index(request):
+    return _render(request, "ui/index.html")
 
-    context_dict = {'projects':projects}
-    return render_to_response("ui/about.html", context_dict, context)
+def about(request):
+    return _render(request, "ui/about.html")
 
 def dailyLog(request):
-    context = RequestContext(request)
-    projects = request.session.get('projects')
-    if not projects:
-        projects = _make_projcet_list(db_dir)
-    
-    context_dict = {'projects':projects}
-    return render_to_response("ui/daily_log.html", context_dict, context)
+    return _render(request, "ui/daily_log.html")
 
 def nav(request):
-    context = RequestContext(request)
-    projects = request.session.get('projects')
-    if not projects:
-        projects = _make_projcet_list(db_dir)
-
-    context_dict = {'projects':projects}
-    return render_to_response("ui/nav.html", context_dict, context)
+    return _render(request, "ui/nav.html")
 
 def sub_nav(request):
     context = RequestContext(request)
@@ -148,9 +149,7 @@ def sub_nav(request):
 
 def sub_nav_list(request):
     context = RequestContext(request)
-    projects = request.session.get('projects')
-    if not projects:
-        projects = _make_projcet_list(db_dir)
+    projects = _projects_for(db_dir)
         
     for key in request.GET:
         if key in projects:
@@ -15,6 +15,33 @@ def test_tracker():
     import numpy as np
     assert tracker(np.sqrt.__acorn__) in ["numpy.sqrt", "numpy.matlib.sqrt"]
 
+def test_tracker_numeric():
+    """Tests the summary of lists and tuples that only contain untracked values.
+    """
+    from acorn.logging.database import tracker
+    values = [3, 1.5, 7, -2] * 10
+    expected = "{} len=40 min=-2 max=7".format(type(values))
+    assert tracker(values) == expected
+    assert tracker(tuple(values)) == expected.replace(str(list), str(tuple))
+
+def test_tracker_gc():
+    """Tests that tracked objects are not kept alive by the tracker and that
+    their entries are dropped once they are collected.
+    """
+    from acorn.logging.database import tracker, oids, uuids
+    import gc
+    class Tracked(object):
+        pass
+    o = Tracked()
+    oid, uuid = id(o), tracker(o).uuid
+    assert oids[oid].obj is o
+    assert uuids[uuid].obj is o
+
+    del o
+    gc.collect()
+    assert oid not in oids or oids[oid].uuid != uuid
+    assert uuid not in uuids
+
 def test_dbdir():
     """Tests resetting the database directory manually.
     """
@@ -43,3 +70,72 @@ def test_listproj():
     from acorn.utility import abspath
     tasks = list_tasks(abspath("./tests/dbs"))
     assert tasks == {'default': ['default'], 'haul': ['bcs'], 'acorn': ['x']}
+
+def test_wal(dbdir):
+    """Tests that entries recorded since the last full save are replayed from
+    the append-only log, and that a full save removes the log again.
+    """
+    from acorn.logging import database
+    from os import path
+    oproject, otask = database.project, database.task
+    database.set_task("acorn", "wal")
+
+    db = database.TaskDB(str(dbdir))
+    db.save(True)
+    entry = {"m": "numpy.sqrt", "a": None, "s": 0., "r": None, "c": None}
+    db.record("numpy.sqrt", entry)
+    db.record(("a", "b"), dict(entry))
+    db._wal.flush()
+    assert path.isfile(db.walpath)
+
+    replay = database.TaskDB(str(dbdir))
+    assert replay.entities == {"numpy.sqrt": [entry], ("a", "b"): [entry]}
+
+    db.save(True)
+    assert not path.isfile(db.walpath)
+    reloaded = database.TaskDB(str(dbdir))
+    assert reloaded.entities["numpy.sqrt"] == [entry]
+    assert reloaded.walgen == db.walgen
+
+    database.set_task(oproject, otask)
+
+def test_wal_corrupt(dbdir):
+    """Tests that a log with a truncated header is discarded instead of
+    breaking the database load.
+    """
+    from acorn.logging import database
+    from os import path
+    oproject, otask = database.project, database.task
+    database.set_task("acorn", "walcorrupt")
+
+    db = database.TaskDB(str(dbdir))
+    db.save(True)
+    with open(db.walpath, 'w') as f:
+        f.write('{"g":')
+
+    reloaded = database.TaskDB(str(dbdir))
+    assert reloaded.entities == {}
+    assert not path.isfile(reloaded.walpath)
+
+    database.set_task(oproject, otask)
+
+def test_nonfinite(dbdir):
+    """Tests that non-finite float arguments survive both the log replay and a
+    full save of the database.
+    """
+    from acorn.logging import database
+    oproject, otask = database.project, database.task
+    database.set_task("acorn", "nonfinite")
+
+    db = database.TaskDB(str(dbdir))
+    db.save(True)
+    entry = {"m": "numpy.clip", "a": {"_": ["x", 0, float("inf")]},
+             "s": 0., "r": None, "c": None}
+    db.record("numpy.clip", entry)
+    db._wal.flush()
+    assert database.TaskDB(str(dbdir)).entities == {"numpy.clip": [entry]}
+
+    db.save(True)
+    assert database.TaskDB(str(dbdir)).entities == {"numpy.clip": [entry]}
+
+    database.set_task(oproject, otask)